@@ -31,6 +31,10 @@ class DeepGallery
 # Python modules    #
 #-------------------#
 import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 # import pdb
 
 # import warnings
@@ -44,8 +48,9 @@ from gramps.gen.const import GRAMPS_LOCALE as glocale
 from gramps.gen.utils.file import media_path_full
 from gramps.gui.utils import (is_right_click,
                               open_file_with_default_application)
-from gramps.gen.utils.thumbnails import (get_thumbnail_image,
-                                         SIZE_NORMAL, SIZE_LARGE)
+from gramps.gen.utils.thumbnails import (get_thumbnail_path,
+                                         SIZE_NORMAL, SIZE_LARGE,
+                                         THUMBSCALE, THUMBSCALE_LARGE)
 from gramps.gui.editors import EditMedia
 from gramps.gui.widgets.menuitem import add_menuitem
 
@@ -54,7 +59,7 @@ from gramps.gui.widgets.menuitem import add_menuitem
 #------------------#
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Gdk, GdkPixbuf, Gio, GLib
 
 #------------------#
 # Translation      #
@@ -75,6 +80,233 @@ MSG_OPEN_CONTAINING_FOLDER = _('Open Containing Folder')
 MSG_EDIT = _('Edit')
 MSG_MAKE_ACTIVE_MEDIA = _('Make Active Media')
 
+#-------------#
+# Constants   #
+#-------------#
+MAX_REALIZED_ROWS = 50  # Photos kept alive after scrolling out of view
+ADD_BATCH_SIZE = 20     # Rows added between two steps of main()
+
+# Fields of the raw (serialized) media data
+RAW_PATH = 2
+RAW_MIME = 3
+RAW_DESC = 4
+
+# What the gallery needs to know about one media object. mtime is None if
+# the file is missing.
+MediaInfo = namedtuple('MediaInfo', ('handle desc path mime full_path folder '
+                                     'mtime is_image'))
+
+# Thumbnails are decoded here, off the GTK main thread. Prefetched large
+# images get their own worker, so they never delay visible thumbnails.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+PIXBUF_CACHE_BUDGET = 64 * 1024 * 1024  # Bytes of decoded thumbnails
+
+
+#-------------------#
+#                   #
+# Thumbnail cache   #
+#                   #
+#-------------------#
+_PIXBUF_CACHE = OrderedDict()
+_PIXBUF_CACHE_LOCK = threading.Lock()
+_pixbuf_cache_bytes = 0
+_FUTURES = dict()    # Key -> [future, number of photos holding it]
+_FUTURES_LOCK = threading.RLock()
+
+
+def _thumbnail_key(info, size):
+    """
+    Return the cache key of a thumbnail. The modification time of the file
+    is part of the key, so that changed files are decoded again while
+    unchanged ones never reach the Gramps thumbnail code.
+    """
+    return (info.full_path, info.mtime, info.mime, size)
+
+
+def _cache_get(key):
+    """
+    Return the cached thumbnail for the key, or None.
+    """
+    with _PIXBUF_CACHE_LOCK:
+        pixbuf = _PIXBUF_CACHE.get(key)
+        if pixbuf is not None:
+            _PIXBUF_CACHE.move_to_end(key)
+        return pixbuf
+
+
+def _peek_thumbnail(info, size):
+    """
+    Return the thumbnail if it is in the shared cache, else None.
+    """
+    return _cache_get(_thumbnail_key(info, size))
+
+
+def _decode_thumbnail(full_path, mime_type, size):
+    """
+    Return the thumbnail decoded with GdkPixbuf, or None if it cannot be
+    decoded. Unlike get_thumbnail_image, this never falls back to a themed
+    icon, so it makes no GTK calls and can run in a worker thread.
+    """
+    try:
+        thumb_path = get_thumbnail_path(full_path, mime_type, None, size)
+        return GdkPixbuf.Pixbuf.new_from_file(thumb_path)
+    except (GLib.Error, OSError):
+        return None
+
+
+def _cached_thumbnail(info, size):
+    """
+    Return the thumbnail from the shared cache, decoding it on a miss.
+    Least recently used thumbnails are evicted once the cache exceeds
+    PIXBUF_CACHE_BUDGET. Returns None if the thumbnail cannot be decoded;
+    failures are not cached. Safe to call from worker threads.
+    """
+    global _pixbuf_cache_bytes
+    key = _thumbnail_key(info, size)
+    pixbuf = _cache_get(key)
+    if pixbuf is not None:
+        return pixbuf
+
+    pixbuf = _decode_thumbnail(info.full_path, info.mime, size)
+    if pixbuf is None:
+        return None
+    with _PIXBUF_CACHE_LOCK:
+        if key not in _PIXBUF_CACHE:
+            _PIXBUF_CACHE[key] = pixbuf
+            _pixbuf_cache_bytes += pixbuf.get_byte_length()
+            while (_pixbuf_cache_bytes > PIXBUF_CACHE_BUDGET
+                   and len(_PIXBUF_CACHE) > 1):
+                old = _PIXBUF_CACHE.popitem(last=False)[1]
+                _pixbuf_cache_bytes -= old.get_byte_length()
+    return pixbuf
+
+
+def _thumbnail_future(info, size, executor=_EXECUTOR, hold=True):
+    """
+    Return a future for the thumbnail, decoded by the executor. While a
+    thumbnail is being decoded, the same future is returned for it.
+
+    With hold, the caller must pass the future to _release_future() once
+    it no longer wants the result.
+    """
+    key = _thumbnail_key(info, size)
+    with _FUTURES_LOCK:
+        entry = _FUTURES.get(key)
+        submitted = entry is None
+        if submitted:
+            entry = [executor.submit(_cached_thumbnail, info, size), 0]
+            _FUTURES[key] = entry
+        if hold:
+            entry[1] += 1
+        future = entry[0]
+    if submitted:
+        future.add_done_callback(lambda f: _forget_future(key))
+    return future
+
+
+def _release_future(info, size, future):
+    """
+    Give up a future obtained from _thumbnail_future(). Once no photo holds
+    it any more, it is cancelled if it has not started yet.
+    """
+    key = _thumbnail_key(info, size)
+    with _FUTURES_LOCK:
+        entry = _FUTURES.get(key)
+        if entry is None or entry[0] is not future:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            # Cancelling runs _forget_future(), hence the reentrant lock
+            future.cancel()
+
+
+def _future_pixbuf(future):
+    """
+    Return the thumbnail of a finished future, or None if decoding failed
+    or was cancelled.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+def _forget_future(key):
+    """
+    Drop a finished future. Its thumbnail is in the cache by now.
+    """
+    with _FUTURES_LOCK:
+        _FUTURES.pop(key, None)
+
+
+#-------------------#
+#                   #
+# Icons             #
+#                   #
+#-------------------#
+_ICON_CACHE = dict()
+
+
+def _icon_pixbuf(icon_name):
+    """
+    Return the themed icon of thumbnail size, shown in place of media that
+    are not images or whose files are missing.
+    """
+    pixbuf = _ICON_CACHE.get(icon_name)
+    if pixbuf is None:
+        theme = Gtk.IconTheme.get_default()
+        try:
+            pixbuf = theme.load_icon(icon_name, int(THUMBSCALE),
+                                     Gtk.IconLookupFlags.GENERIC_FALLBACK)
+        except GLib.Error:
+            pixbuf = theme.load_icon('image-missing', int(THUMBSCALE),
+                                     Gtk.IconLookupFlags.GENERIC_FALLBACK)
+        _ICON_CACHE[icon_name] = pixbuf
+    return pixbuf
+
+
+def _mime_icon_name(mime_type):
+    """
+    Return the name of the generic icon for a mime type.
+    """
+    icon_name = None
+    content_type = (Gio.content_type_from_mime_type(mime_type)
+                    if mime_type else None)
+    if content_type:
+        icon_name = Gio.content_type_get_generic_icon_name(content_type)
+    return icon_name or 'text-x-generic'
+
+
+@lru_cache(maxsize=4096)
+def _resolve_path(db, base_path, rel_path):
+    """
+    Return the full path of a media file and the folder containing it.
+    base_path is the media base path of the database. It is not used
+    directly, but being part of the cache key it makes a change in the
+    preferences take effect. Cleared whenever the database changes.
+    """
+    full_path = media_path_full(db, rel_path)
+    return full_path, os.path.split(full_path)[0]
+
+
+def _make_media_info(db, base_path, media_handle, raw):
+    """
+    Return the MediaInfo for the raw data of one media. This is the only
+    place the media file is looked at; its modification time and whether
+    it is an existing image are kept on the MediaInfo.
+    """
+    full_path, folder = _resolve_path(db, base_path, raw[RAW_PATH])
+    mime_type = raw[RAW_MIME]
+    try:
+        mtime = os.stat(full_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    is_image = bool(mime_type and mime_type.startswith('image/')
+                    and mtime is not None)
+    return MediaInfo(media_handle, raw[RAW_DESC], raw[RAW_PATH], mime_type,
+                     full_path, folder, mtime, is_image)
+
 
 #-------------------#
 #                   #
@@ -93,7 +325,17 @@ class DeepGallery(Gramplet):
         self.gui.WIDGET = self.build_gui()
         self.gui.get_container_widget().remove(self.gui.textview)
         self.gui.get_container_widget().add(self.gui.WIDGET)
-        self.image_list = list()
+        self.image_list = dict()
+        self.realized = OrderedDict()
+        self._update_id = 0
+        self._generation = 0
+        self.hovered = None
+        self.menu_photo = None
+        self.menu = self.build_menu()
+
+        vadjustment = self.gui.get_container_widget().get_vadjustment()
+        vadjustment.connect('value-changed', self._update_visible)
+        vadjustment.connect('changed', self._update_visible)
 
 
     def active_changed(self, handle):
@@ -102,6 +344,7 @@ class DeepGallery(Gramplet):
 
         Overrides method in class Gramplet.
         """
+        self._generation += 1
         self.update()
 
 
@@ -109,57 +352,260 @@ class DeepGallery(Gramplet):
         """
         Build user interface.
         """
-        self.content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        self.content_box.homogenous = False
+        self.content_box = Gtk.ListBox()
+        self.content_box.set_selection_mode(Gtk.SelectionMode.NONE)
         self.content_box.set_border_width(10)
+        self.content_box.set_sort_func(self._sort_images)
+        self.content_box.add_events(Gdk.EventMask.POINTER_MOTION_MASK
+                                    | Gdk.EventMask.LEAVE_NOTIFY_MASK)
+        self.content_box.connect('button-press-event',
+                                 self._handle_button_press)
+        self.content_box.connect('motion-notify-event', self._motion_notify)
+        self.content_box.connect('leave-notify-event', self._leave_notify)
+        self.content_box.show()
         return self.content_box
 
 
-    def add_image(self, media_handle):
+    @staticmethod
+    def _photo_for_event(event):
+        """
+        Return the photo in which an event of the content box occurred, or
+        None.
+        """
+        widget = Gtk.get_event_widget(event)
+        if widget is None:
+            return None
+        return widget.get_ancestor(DeepPhoto)
+
+
+    def _set_hovered(self, photo):
+        """
+        Show the large image of the photo under the pointer, and the
+        normal-sized image of the one previously under it.
+        """
+        if photo is self.hovered:
+            return
+        if self.hovered:
+            self.hovered.show_normal()
+        self.hovered = photo
+        if photo:
+            photo.show_large()
+
+
+    def _motion_notify(self, widget, event):
+        """
+        Track the photo under the pointer.
+        """
+        self._set_hovered(self._photo_for_event(event))
+        return False
+
+
+    def _leave_notify(self, widget, event):
+        """
+        The pointer left the content box.
+        """
+        if event.detail != Gdk.NotifyType.INFERIOR:
+            self._set_hovered(None)
+        return False
+
+
+    def _handle_button_press(self, widget, event):
+        """
+        Handle putton press. On double-click, open the edit media window.
+        On right-click, open a menu.
+        """
+        photo = self._photo_for_event(event)
+        if photo is None:
+            return False
+
+        if (event.type == Gdk.EventType.DOUBLE_BUTTON_PRESS
+                and event.button == 1):
+            EditMedia(self.dbstate, self.uistate, [], photo.get_media())
+            return True
+
+        if is_right_click(event):
+            if photo.handle and self.uistate:
+                self._show_menu(photo, event)
+                return True
+
+        return False
+
+
+    def build_menu(self):
+        """
+        Build the right-click menu, shared by all photos. The menu items
+        act on self.menu_photo.
+        """
+        menu = Gtk.Menu()
+        add_menuitem(menu, MSG_VIEW, self.content_box,
+                     lambda obj: open_file_with_default_application
+                     (self.menu_photo.full_path, self.uistate))
+        add_menuitem(menu, MSG_OPEN_CONTAINING_FOLDER, self.content_box,
+                     lambda obj: open_file_with_default_application
+                     (self.menu_photo.folder, self.uistate))
+        self._add_menu_separator(menu)
+        add_menuitem(menu, MSG_EDIT, self.content_box,
+                     lambda obj: EditMedia(self.dbstate, self.uistate, [],
+                                           self.menu_photo.get_media()))
+        self._add_menu_separator(menu)
+        add_menuitem(menu, MSG_MAKE_ACTIVE_MEDIA, self.content_box,
+                     lambda obj: self.uistate.set_active
+                     (self.menu_photo.handle, "Media"))
+        return menu
+
+
+    def _show_menu(self, photo, event):
+        """
+        Show right-click menu for the photo.
+        """
+        self.menu_photo = photo
+        self.menu.popup(None, None, None, None, event.button, event.time)
+
+
+    @classmethod
+    def _add_menu_separator(cls, menu):
+        """
+        Add separator to menu.
+        """
+        sep = Gtk.SeparatorMenuItem()
+        sep.show()
+        menu.append(sep)
+
+
+    @staticmethod
+    def _sort_images(image1, image2):
+        """
+        Sort function for the rows of the content box.
+        """
+        return image1.position - image2.position
+
+
+    def add_image(self, info, position):
+        """
+        Add a placeholder for one image from the media info. The photo
+        itself is only created once the row scrolls into view.
+        """
+        image = ImageBox(self.dbstate, info)
+        image.position = position
+        self.content_box.add(image)
+        image.show_all()
+        self.image_list[info.handle] = image
+
+
+    def remove_image(self, media_handle):
         """
-        Add one image from the media handle
+        Remove one image from the Gramplet.
         """
-        media = self.dbstate.db.get_media_from_handle(media_handle)
-        image = ImageBox(self.dbstate, self.uistate, media)
-        self.content_box.pack_start(image, False, False, 5)
-        self.image_list.append(image)
+        image = self.image_list.pop(media_handle)
+        self.realized.pop(image, None)
+        if self.hovered is image.photo:
+            self.hovered = None
+        image.detach_photo()
+        self.content_box.remove(image)
+        image.destroy()
 
 
     def clear_images(self):
         """
         Remove all images from the Gramplet.
         """
-        for image in self.image_list:
-            self.content_box.remove(image)
-        self.image_list = []
+        for media_handle in list(self.image_list):
+            self.remove_image(media_handle)
+
+
+    def _update_visible(self, *args):
+        """
+        Create the photos for all rows currently visible in the scrolled
+        window. Photos of rows that went out of view are released once more
+        than MAX_REALIZED_ROWS are alive.
+        """
+        vadjustment = self.gui.get_container_widget().get_vadjustment()
+        top = vadjustment.get_value()
+        bottom = top + vadjustment.get_page_size()
+        visible = []
+        for image in self.image_list.values():
+            alloc = image.get_allocation()
+            if (alloc.y >= 0 and alloc.y + alloc.height >= top
+                    and alloc.y <= bottom):
+                visible.append(image)
+
+        # Start decoding all new thumbnails before building any photo
+        for image in visible:
+            if (image not in self.realized and image.info.is_image
+                    and _peek_thumbnail(image.info, SIZE_NORMAL) is None):
+                _thumbnail_future(image.info, SIZE_NORMAL, hold=False)
+
+        for image in visible:
+            if image in self.realized:
+                self.realized.move_to_end(image)
+                continue
+            image.attach_photo()
+            self.realized[image] = None
+            if len(self.realized) > MAX_REALIZED_ROWS:
+                oldest = self.realized.popitem(last=False)[0]
+                if self.hovered is oldest.photo:
+                    self.hovered = None
+                oldest.detach_photo()
+        return False
 
 
     def process_media(self, gobj):
         """
         Loop through items of media list, and save all media handles.
+
+        The media objects themselves are not fetched here. See
+        resolve_media().
         """
         for media_ref in gobj.get_media_list():
             media_handle = media_ref.get_reference_handle()
-            if not media_handle in self.all_media:
-                media = self.dbstate.db.get_media_from_handle(media_handle)
-                self.all_media[media_handle] = media.get_description()
+            if media_handle not in self._seen:
+                self._seen.add(media_handle)
+                self._handles.append(media_handle)
+
+
+    def resolve_media(self):
+        """
+        Fetch the media info of every media handle collected by
+        process_media() in a single pass, together with the locale sort key
+        of its description. _media_info and _sort_keys are kept parallel to
+        _handles.
+
+        Only raw media data is read, no Media objects are built. Full paths
+        are resolved here as well, before any widget is built.
+        """
+        db = self.dbstate.db
+        base_path = db.get_mediapath()
+        raw_list = [db.get_raw_media_data(media_handle)
+                    for media_handle in self._handles]
+        self._media_info = [_make_media_info(db, base_path, media_handle, raw)
+                            for media_handle, raw
+                            in zip(self._handles, raw_list)]
+        self._sort_keys = [glocale.sort_key(info.desc)
+                           for info in self._media_info]
 
 
     def process_citations(self, gobj):
         """
-        Loop through citation list for specified object.
+        Loop through citation list for specified object. Citations already
+        processed are skipped.
         """
         for cit_handle in gobj.get_citation_list():
+            if cit_handle in self._seen_citations:
+                continue
+            self._seen_citations.add(cit_handle)
             cit = self.dbstate.db.get_citation_from_handle(cit_handle)
             self.process_media(cit)
 
 
     def process_events(self, gobj):
         """
-        Process events.
+        Process events. Events already processed are skipped.
         """
         for event_ref in gobj.get_event_ref_list():
             event_handle = event_ref.get_reference_handle()
+            if event_handle in self._seen_events:
+                continue
+            self._seen_events.add(event_handle)
             event = self.dbstate.db.get_event_from_handle(event_handle)
             self.process_citations(event)
 
@@ -170,35 +616,62 @@ class DeepGallery(Gramplet):
 
         Note: If an person, family, or event changes, the gallery may change.
         """
-        self.connect(self.dbstate.db, 'person-update', self.update)
-        self.connect(self.dbstate.db, 'family-add', self.update)
-        self.connect(self.dbstate.db, 'family-update', self.update)
-        self.connect(self.dbstate.db, 'family-delete', self.update)
-        self.connect(self.dbstate.db, 'event-add', self.update)
-        self.connect(self.dbstate.db, 'event-delete', self.update)
-        self.connect(self.dbstate.db, 'event-update', self.update)
-        self.connect(self.dbstate.db, 'citation-add', self.update)
-        self.connect(self.dbstate.db, 'citation-delete', self.update)
-        self.connect(self.dbstate.db, 'citation-update', self.update)
-        self.connect(self.dbstate.db, 'media-add', self.update)
-        self.connect(self.dbstate.db, 'media-delete', self.update)
-        self.connect(self.dbstate.db, 'media-update', self.update)
+        _resolve_path.cache_clear()
+        self.connect(self.dbstate.db, 'person-update', self._schedule_update)
+        self.connect(self.dbstate.db, 'family-add', self._schedule_update)
+        self.connect(self.dbstate.db, 'family-update', self._schedule_update)
+        self.connect(self.dbstate.db, 'family-delete', self._schedule_update)
+        self.connect(self.dbstate.db, 'event-add', self._schedule_update)
+        self.connect(self.dbstate.db, 'event-delete', self._schedule_update)
+        self.connect(self.dbstate.db, 'event-update', self._schedule_update)
+        self.connect(self.dbstate.db, 'citation-add', self._schedule_update)
+        self.connect(self.dbstate.db, 'citation-delete', self._schedule_update)
+        self.connect(self.dbstate.db, 'citation-update', self._schedule_update)
+        self.connect(self.dbstate.db, 'media-add', self._schedule_update)
+        self.connect(self.dbstate.db, 'media-delete', self._schedule_update)
+        self.connect(self.dbstate.db, 'media-update', self._schedule_update)
+
+
+    def _schedule_update(self, *args):
+        """
+        Update the gallery once the main loop is idle. Further database
+        signals arriving before then do not cause additional updates.
+        """
+        if not self._update_id:
+            self._update_id = GLib.idle_add(self._flush_update,
+                                            priority=GLib.PRIORITY_LOW)
+
+
+    def _flush_update(self):
+        """
+        Run the update scheduled by _schedule_update().
+        """
+        self._update_id = 0
+        self._generation += 1
+        self.update()
+        return False
 
 
     def main(self):
         """
-        Generator which will be run in the background.
+        Generator which will be run in the background. It stops at the next
+        step once a newer update has been started.
 
         Overrides method in class Gramplet.
         """
-        self.clear_images()
-
+        generation = self._generation
         active_handle = self.get_active('Person')
         if not active_handle:
+            self.clear_images()
             return
 
         active = self.dbstate.db.get_person_from_handle(active_handle)
-        self.all_media = dict()
+        self._handles = []
+        self._media_info = []
+        self._sort_keys = []
+        self._seen = set()
+        self._seen_events = set()
+        self._seen_citations = set()
 
         # Get all media for person
         self.process_media(active)
@@ -210,46 +683,119 @@ class DeepGallery(Gramplet):
         self.process_citations(active.get_primary_name())
         for name in active.get_alternate_names():
             self.process_citations(name)
+        yield True
+        if self._generation != generation:
+            return
 
         # Get all media for event citations
         self.process_events(active)
+        yield True
+        if self._generation != generation:
+            return
 
         # Get all media for family, and family event citations
         for family_handle in active.get_family_handle_list():
             family = self.dbstate.db.get_family_from_handle(family_handle)
             self.process_media(family)
             self.process_events(family)
-
-        # Display all media
-        media_list = list(self.all_media.items())
-        media_list.sort(key=lambda x: x[1])
-        for media in media_list:
-            self.add_image(media[0])
-
-        self.content_box.show_all()
-
-
-class ImageBox(Gtk.Box):
+            yield True
+            if self._generation != generation:
+                return
+
+        # Fetch descriptions of all media found above
+        self.resolve_media()
+
+        # Display all media, reusing images of unchanged media
+        for media_handle in self.image_list.keys() - self._seen:
+            self.remove_image(media_handle)
+
+        order = sorted(range(len(self._handles)),
+                       key=self._sort_keys.__getitem__)
+        new_media = []
+        for position, index in enumerate(order):
+            info = self._media_info[index]
+            image = self.image_list.get(info.handle)
+            if image and image.info != info:
+                self.remove_image(info.handle)
+                image = None
+            if image:
+                image.position = position
+            else:
+                new_media.append((info, position))
+        self.content_box.invalidate_sort()
+
+        # New rows are sorted into place as they are added
+        for start in range(0, len(new_media), ADD_BATCH_SIZE):
+            self.content_box.freeze_child_notify()
+            for media in new_media[start:start+ADD_BATCH_SIZE]:
+                self.add_image(*media)
+            self.content_box.thaw_child_notify()
+            yield True
+            if self._generation != generation:
+                return
+
+        # Row allocations are only known after the next layout pass
+        GLib.idle_add(self._update_visible, priority=GLib.PRIORITY_LOW)
+
+
+class ImageBox(Gtk.ListBoxRow):
     """
     Graphic for one image on the screen.
+
+    Until attach_photo() is called, a blank image the size of the photo
+    stands in for it.
     """
 
-    def __init__(self, dbstate, uistate, media):
+    def __init__(self, dbstate, info):
         """
         """
-        super().__init__(orientation=Gtk.Orientation.VERTICAL)
-
-        photo = DeepPhoto(dbstate, uistate, media)
-        photo.set_halign(Gtk.Align.START)
-        self.pack_start(photo, False, False, 5)
+        super().__init__()
+        self.set_activatable(False)
+        self.set_selectable(False)
 
-        desc = media.get_description()
-        desc_label = Gtk.Label(label=desc)
+        self.dbstate = dbstate
+        self.info = info
+        self.position = 0
+        self.photo = None
+
+        self.box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self.add(self.box)
+
+        self.placeholder = Gtk.Image()
+        self.placeholder.set_size_request(int(THUMBSCALE_LARGE),
+                                          int(THUMBSCALE_LARGE))
+        self.placeholder.set_halign(Gtk.Align.START)
+        self.placeholder.set_no_show_all(True)
+        self.placeholder.show()
+        self.box.pack_start(self.placeholder, False, False, 5)
+
+        desc_label = Gtk.Label(label=info.desc)
         desc_label.set_halign(Gtk.Align.START)
         desc_label.set_justify(Gtk.Justification.LEFT)
-        self.pack_start(desc_label, False, False, 5)
+        self.box.pack_start(desc_label, False, False, 5)
+
 
-        self.show_all()
+    def attach_photo(self):
+        """
+        Replace the placeholder with the photo.
+        """
+        self.photo = DeepPhoto(self.dbstate, self.info)
+        self.photo.set_halign(Gtk.Align.START)
+        self.box.pack_start(self.photo, False, False, 5)
+        self.box.reorder_child(self.photo, 0)
+        self.placeholder.hide()
+        self.photo.show_all()
+
+
+    def detach_photo(self):
+        """
+        Release the photo and show the placeholder again.
+        """
+        if self.photo:
+            self.photo.release()
+            self.photo.destroy()
+            self.photo = None
+        self.placeholder.show()
 
 
 #------------------#
@@ -260,99 +806,159 @@ class ImageBox(Gtk.Box):
 class DeepPhoto(Gtk.EventBox):
     """
     Like class Photo, but with different actions.
+
+    Pointer events are handled by the DeepGallery content box.
     """
 
-    def __init__(self, dbstate, uistate, media):
+    def __init__(self, dbstate, info):
         """
         __init__()
         """
         super().__init__()
 
         self.dbstate = dbstate
-        self.uistate = uistate
-        self.media = media
-        self.handle = media.get_handle()
+        self.info = info
+        self.handle = info.handle
 
-        self.connect('button-press-event', self._handle_button_press)
-        self.connect('enter-notify-event', self._enter_notify)
-        self.connect('leave-notify-event', self._leave_notify)
+        self.add_events(Gdk.EventMask.POINTER_MOTION_MASK)
         self.set_tooltip_text(MSG_PHOTO_TOOLTIP)
-        self.full_path = media_path_full(dbstate.db, media.get_path())
-        self.folder = os.path.split(self.full_path)[0]
+        self.full_path = info.full_path
+        self.folder = info.folder
 
+        # Reserve room for the large image, so hovering does not relayout
         self.photo = Gtk.Image()
+        self.photo.set_size_request(int(THUMBSCALE_LARGE),
+                                    int(THUMBSCALE_LARGE))
+        self.photo.set_from_icon_name('image-loading', Gtk.IconSize.DIALOG)
         self.add(self.photo)
-        self.mime_type = media.get_mime_type()
-        self.normal_pixbuf = get_thumbnail_image(self.full_path,
-                                                 self.mime_type,
-                                                 None, SIZE_NORMAL)
-        self.large_pixbuf = None
-        self.photo.set_from_pixbuf(self.normal_pixbuf)
+        self.mime_type = info.mime
+        self._large_future = None
+        self._held = []
+        self.released = False
+        self.hovering = False
 
+        # Only images get thumbnails, everything else gets an icon
+        self.is_image = info.is_image
+        if self.is_image:
+            self._load_pixbuf(SIZE_NORMAL, self._apply_normal_pixbuf)
+        elif info.mtime is None:
+            self.photo.set_from_pixbuf(_icon_pixbuf('image-missing'))
+        else:
+            self.photo.set_from_pixbuf(
+                _icon_pixbuf(_mime_icon_name(self.mime_type)))
 
-    def _enter_notify(self, widget, event):
+
+    def get_media(self):
         """
-        Replace the thumbnail with the large image.
+        Fetch the media object, needed only for editing.
         """
-        if not self.large_pixbuf:
-            self.large_pixbuf = get_thumbnail_image(self.full_path,
-                                                    self.mime_type,
-                                                    None, SIZE_LARGE)
-        self.photo.set_from_pixbuf(self.large_pixbuf)
+        return self.dbstate.db.get_media_from_handle(self.handle)
 
 
-    def _leave_notify(self, widget, event):
+    def _load_pixbuf(self, size, callback):
         """
-        Replace the thumbnail with the normal-sized image.
+        Pass the thumbnail to the callback. Cached thumbnails are passed at
+        once, others are decoded in a worker thread and the callback is run
+        on the main thread when done.
         """
-        self.photo.set_from_pixbuf(self.normal_pixbuf)
+        pixbuf = _peek_thumbnail(self.info, size)
+        if pixbuf is not None:
+            callback(pixbuf)
+            return
+        future = self._hold(size)
+        future.add_done_callback(lambda f: GLib.idle_add(callback,
+                                                         _future_pixbuf(f)))
 
 
-    def _handle_button_press(self, widget, event):
+    def _hold(self, size, executor=_EXECUTOR):
         """
-        Handle putton press. On double-click, open the edit media window.
-        On right-click, open a menu.
+        Return the future decoding the thumbnail, held until release().
         """
-        if (event.type == Gdk.EventType.DOUBLE_BUTTON_PRESS
-                and event.button == 1):
-            EditMedia(self.dbstate, self.uistate, [], self.media)
-            return True
+        self._held = [held for held in self._held if not held[1].done()]
+        future = _thumbnail_future(self.info, size, executor)
+        self._held.append((size, future))
+        return future
+
+
+    def release(self):
+        """
+        Give up all pending thumbnails. Those no other photo waits for are
+        not decoded.
+        """
+        self.released = True
+        for size, future in self._held:
+            _release_future(self.info, size, future)
+        self._held = []
+
+
+    def _prefetch_large(self, executor=_PREFETCH_EXECUTOR):
+        """
+        Start decoding the large image in the background, so that it is
+        usually ready by the time the pointer enters the photo. When the
+        pointer is already over the photo, pass _EXECUTOR so the decode does
+        not wait behind other prefetches.
+        """
+        self._large_future = self._hold(SIZE_LARGE, executor)
+        self._large_future.add_done_callback(
+            lambda f: GLib.idle_add(self._apply_large_pixbuf,
+                                    _future_pixbuf(f),
+                                    priority=GLib.PRIORITY_LOW))
 
-        if is_right_click(event):
-            if self.handle and self.uistate:
-                self._show_menu(widget, event)
-                return True
 
+    def _show_pixbuf(self, pixbuf):
+        """
+        Show the thumbnail, or the missing image icon if it could not be
+        decoded.
+        """
+        if pixbuf is None:
+            pixbuf = _icon_pixbuf('image-missing')
+        self.photo.set_from_pixbuf(pixbuf)
+
+
+    def _apply_normal_pixbuf(self, pixbuf):
+        """
+        Show the normal-sized thumbnail, unless the pointer is over the
+        photo. Then prefetch the large image.
+        """
+        if self.released:
+            return False
+        if not self.hovering:
+            self._show_pixbuf(pixbuf)
+        if pixbuf is not None and self._large_future is None:
+            self._prefetch_large()
         return False
 
 
-    def _show_menu(self, widget, event):
+    def _apply_large_pixbuf(self, pixbuf):
         """
-        Show right-click menu.
+        Show the large image, if the pointer is still over the photo.
         """
-        menu = Gtk.Menu()
-        add_menuitem(menu, MSG_VIEW, widget,
-                     lambda obj: open_file_with_default_application
-                     (self.full_path, self.uistate))
-        add_menuitem(menu, MSG_OPEN_CONTAINING_FOLDER, widget,
-                     lambda obj: open_file_with_default_application
-                     (self.folder, self.uistate))
-        self._add_menu_separator(menu)
-        add_menuitem(menu, MSG_EDIT, widget,
-                     lambda obj: EditMedia(self.dbstate, self.uistate,
-                                           [], self.media))
-        self._add_menu_separator(menu)
-        add_menuitem(menu, MSG_MAKE_ACTIVE_MEDIA, widget,
-                     lambda obj: self.uistate.set_active(self.handle,
-                                                         "Media"))
-        menu.popup(None, None, None, None, event.button, event.time)
+        if self.released:
+            return False
+        if self.hovering:
+            self._show_pixbuf(pixbuf)
+        return False
 
 
-    @classmethod
-    def _add_menu_separator(cls, menu):
+    def show_large(self):
         """
-        Add separator to menu.
+        Replace the thumbnail with the large image. If it is still being
+        decoded, it is shown as soon as it is ready.
         """
-        sep = Gtk.SeparatorMenuItem()
-        sep.show()
-        menu.append(sep)
+        if not self.is_image:
+            return
+        self.hovering = True
+        if self._large_future is None:
+            self._prefetch_large(_EXECUTOR)
+        elif self._large_future.done():
+            self._show_pixbuf(_future_pixbuf(self._large_future))
+
+
+    def show_normal(self):
+        """
+        Replace the thumbnail with the normal-sized image.
+        """
+        if not self.is_image:
+            return
+        self.hovering = False
+        self._load_pixbuf(SIZE_NORMAL, self._apply_normal_pixbuf)